@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""
+Test script to validate the token bucket rate limiter in web_server.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Import web_server from the repository root with a fixed API key
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("API_SECRET_KEY", "test-api-key")
+
+from web_server import RATE_LIMIT_IDLE_TIMEOUT, RATE_LIMIT_REQUESTS, buckets, is_rate_limited, sweep_idle_buckets
+
+def test_burst_allowed():
+    """Test that a full bucket allows RATE_LIMIT_REQUESTS requests"""
+    print("🔍 Testing burst of allowed requests...")
+
+    buckets.clear()
+    now = 1000.0
+    limited = [is_rate_limited("10.0.0.1", now) for _ in range(RATE_LIMIT_REQUESTS)]
+
+    if not any(limited):
+        print(f"✅ {RATE_LIMIT_REQUESTS} requests allowed")
+        return True
+    else:
+        print(f"❌ Limited after {limited.index(True)} requests")
+        return False
+
+def test_over_limit_denied():
+    """Test that the request after the burst is denied"""
+    print("\n🔍 Testing request over the limit...")
+
+    buckets.clear()
+    now = 1000.0
+    for _ in range(RATE_LIMIT_REQUESTS):
+        is_rate_limited("10.0.0.1", now)
+
+    if is_rate_limited("10.0.0.1", now):
+        print(f"✅ Request {RATE_LIMIT_REQUESTS + 1} denied")
+        return True
+    else:
+        print(f"❌ Request {RATE_LIMIT_REQUESTS + 1} allowed")
+        return False
+
+def test_token_refill():
+    """Test that one token is refilled after one second"""
+    print("\n🔍 Testing token refill...")
+
+    buckets.clear()
+    now = 1000.0
+    for _ in range(RATE_LIMIT_REQUESTS):
+        is_rate_limited("10.0.0.1", now)
+
+    allowed = not is_rate_limited("10.0.0.1", now + 1.0)
+    denied = is_rate_limited("10.0.0.1", now + 1.0)
+
+    if allowed and denied:
+        print("✅ Exactly one request allowed after 1s")
+        return True
+    else:
+        print(f"❌ Refill incorrect (allowed={allowed}, denied_next={denied})")
+        return False
+
+def test_clients_isolated():
+    """Test that one client's limit does not affect another"""
+    print("\n🔍 Testing per-client isolation...")
+
+    buckets.clear()
+    now = 1000.0
+    for _ in range(RATE_LIMIT_REQUESTS + 1):
+        is_rate_limited("10.0.0.1", now)
+
+    if not is_rate_limited("10.0.0.2", now):
+        print("✅ Other clients are not limited")
+        return True
+    else:
+        print("❌ Other client was limited")
+        return False
+
+def test_sweep_evicts_idle_buckets():
+    """Test that full idle buckets are evicted and active ones are kept"""
+    print("\n🔍 Testing idle bucket sweep...")
+
+    buckets.clear()
+    now = 1000.0
+    is_rate_limited("10.0.0.1", now)
+    is_rate_limited("10.0.0.2", now + RATE_LIMIT_IDLE_TIMEOUT)
+
+    removed = sweep_idle_buckets(now + RATE_LIMIT_IDLE_TIMEOUT + 1.0)
+
+    if removed == 1 and "10.0.0.1" not in buckets and "10.0.0.2" in buckets:
+        print("✅ Idle bucket evicted, active bucket kept")
+        return True
+    else:
+        print(f"❌ Sweep removed {removed}, remaining: {sorted(buckets)}")
+        return False
+
+def test_sweep_keeps_recent_buckets():
+    """Test that buckets used within the idle timeout are kept"""
+    print("\n🔍 Testing sweep of recently used buckets...")
+
+    buckets.clear()
+    now = 1000.0
+    for _ in range(RATE_LIMIT_REQUESTS):
+        is_rate_limited("10.0.0.1", now)
+
+    removed = sweep_idle_buckets(now + 1.0)
+
+    if removed == 0 and "10.0.0.1" in buckets:
+        print("✅ Recently used bucket kept")
+        return True
+    else:
+        print(f"❌ Sweep removed {removed} buckets")
+        return False
+
+def main():
+    """Run all rate limit tests"""
+    print("🚀 WHOOP MCP Rate Limit Validation\n")
+
+    tests = [
+        test_burst_allowed,
+        test_over_limit_denied,
+        test_token_refill,
+        test_clients_isolated,
+        test_sweep_evicts_idle_buckets,
+        test_sweep_keeps_recent_buckets
+    ]
+
+    results = []
+    for test in tests:
+        results.append(test())
+
+    passed = sum(results)
+    total = len(results)
+
+    print(f"\n📊 Test Results:")
+    print(f"✅ Passed: {passed}/{total}")
+    print(f"❌ Failed: {total - passed}/{total}")
+
+    if passed == total:
+        print("\n🎉 All rate limit tests passed!")
+        return 0
+    else:
+        print("\n❌ Some tests failed.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,18 @@
 
 import os
 import asyncio
+import functools
+import hmac
 import json
 import logging
 import secrets
 import time
 from typing import Any, Dict
-from collections import defaultdict
 from datetime import datetime, timedelta
+import httpx
+import orjson
 from fastapi import FastAPI, WebSocket, HTTPException, Request, Header, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uvicorn
@@ -35,14 +38,35 @@ if not API_SECRET_KEY:
     API_SECRET_KEY = secrets.token_urlsafe(32)
     logger.warning("⚠️  API_SECRET_KEY not set! Using temporary key. Set API_SECRET_KEY environment variable for production.")
     logger.info(f"🔑 Temporary API Key: {API_SECRET_KEY}")
+API_SECRET_KEY_BYTES = API_SECRET_KEY.encode()
 
-# Rate limiting storage
-request_counts = defaultdict(list)
+# Rate limiting configuration
 RATE_LIMIT_REQUESTS = 60  # requests per minute
 RATE_LIMIT_WINDOW = 60  # seconds
+RATE_LIMIT_CAPACITY = RATE_LIMIT_REQUESTS  # burst size (tokens)
+RATE_LIMIT_REFILL_RATE = RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW  # tokens per second
+RATE_LIMIT_SWEEP_INTERVAL = 60  # seconds between idle bucket sweeps
+RATE_LIMIT_IDLE_TIMEOUT = 5 * RATE_LIMIT_WINDOW  # seconds before an idle bucket is dropped
+
+class TokenBucket:
+    """Per-client token bucket state"""
+    __slots__ = ("tokens", "last")
+
+    def __init__(self, tokens: float, last: float):
+        self.tokens = tokens
+        self.last = last
+
+# Rate limiting storage
+buckets: Dict[str, TokenBucket] = {}
 
 # Protected endpoints that require API key
 PROTECTED_ENDPOINTS = {"/mcp", "/auth", "/tools"}
+# First path segment of each protected endpoint, for O(1) lookups
+_PROTECTED_ROOTS = frozenset(p.strip("/").split("/", 1)[0] for p in PROTECTED_ENDPOINTS)
+
+# Maximum MCP WebSocket message size (uvicorn rejects larger frames via ws_max_size)
+MCP_MAX_MESSAGE_SIZE = 10000
+WS_MAX_FRAME_SIZE = 10240
 
 # Security headers
 SECURITY_HEADERS = {
@@ -61,81 +85,216 @@ app = FastAPI(
     version="2.0.0",
 )
 
+# Pre-encoded ASGI form of SECURITY_HEADERS, appended to every response
+_SECURITY_HEADERS_RAW: list[tuple[bytes, bytes]] = [
+    (k.lower().encode(), v.encode()) for k, v in SECURITY_HEADERS.items()
+]
+
+def encode_json(content: Any) -> bytes:
+    """Encode content to JSON bytes exactly as JSONResponse would"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+def _encode_rejection(error: str) -> tuple[list[tuple[bytes, bytes]], bytes]:
+    """Pre-encode the headers and body of a JSON error response"""
+    body = encode_json({"error": error})
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ] + _SECURITY_HEADERS_RAW
+    return headers, body
+
+# Pre-encoded responses for requests rejected by the security middleware
+_REJECTIONS = {
+    401: _encode_rejection("Unauthorized. Valid X-API-Key header required."),
+    429: _encode_rejection("Rate limit exceeded. Please try again later."),
+}
+
 # Security Functions
-def get_client_ip(request: Request) -> str:
-    """Get client IP address from request"""
-    forwarded = request.headers.get("X-Forwarded-For")
+def get_header(scope, name: bytes):
+    """Get a raw header value from an ASGI scope (names are lowercase bytes)"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+def get_client_ip(scope) -> str:
+    """Get client IP address from ASGI scope"""
+    forwarded = get_header(scope, b"x-forwarded-for")
     if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
+        # Only the first (client) address matters; decode just that prefix
+        comma = forwarded.find(b",")
+        return (forwarded[:comma] if comma >= 0 else forwarded).strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
 
-def is_rate_limited(client_ip: str) -> bool:
-    """Check if client IP is rate limited"""
-    now = time.time()
-    window_start = now - RATE_LIMIT_WINDOW
+def is_rate_limited(client_ip: str, now: float) -> bool:
+    """Check if client IP is rate limited (token bucket, now from time.perf_counter())"""
+    bucket = buckets.get(client_ip)
     
-    # Clean old requests
-    request_counts[client_ip] = [req_time for req_time in request_counts[client_ip] if req_time > window_start]
+    if bucket is None:
+        # New clients start with a full bucket, minus this request
+        buckets[client_ip] = TokenBucket(RATE_LIMIT_CAPACITY - 1, now)
+        return False
+    
+    # Refill tokens for the time elapsed since the last request
+    bucket.tokens = min(RATE_LIMIT_CAPACITY, bucket.tokens + (now - bucket.last) * RATE_LIMIT_REFILL_RATE)
+    bucket.last = now
     
     # Check if over limit
-    if len(request_counts[client_ip]) >= RATE_LIMIT_REQUESTS:
+    if bucket.tokens < 1:
         return True
     
-    # Add current request
-    request_counts[client_ip].append(now)
+    # Consume a token for the current request
+    bucket.tokens -= 1
     return False
 
-def verify_api_key(api_key: str) -> bool:
-    """Verify API key is valid"""
-    return api_key and api_key == API_SECRET_KEY
+def sweep_idle_buckets(now: float) -> int:
+    """Drop buckets that are idle and full again; returns the number removed"""
+    idle_before = now - RATE_LIMIT_IDLE_TIMEOUT
+    removed = 0
+    
+    # Copy keys so buckets can be deleted while iterating
+    for client_ip in list(buckets):
+        bucket = buckets[client_ip]
+        if bucket.last > idle_before:
+            continue
+        # A full, idle bucket carries no state a fresh bucket wouldn't have
+        if bucket.tokens + (now - bucket.last) * RATE_LIMIT_REFILL_RATE >= RATE_LIMIT_CAPACITY:
+            del buckets[client_ip]
+            removed += 1
+    
+    return removed
+
+async def rate_limit_sweeper():
+    """Periodically evict idle rate limit buckets"""
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL)
+        removed = sweep_idle_buckets(time.perf_counter())
+        if removed:
+            logger.info(f"🧹 Evicted {removed} idle rate limit buckets")
+
+def verify_api_key(api_key: bytes | None) -> bool:
+    """Verify raw X-API-Key header bytes are valid (constant-time comparison)"""
+    if not api_key:
+        return False
+    return hmac.compare_digest(api_key, API_SECRET_KEY_BYTES)
 
 def requires_api_key(path: str) -> bool:
     """Check if endpoint requires API key"""
-    return any(path.startswith(endpoint) for endpoint in PROTECTED_ENDPOINTS)
+    return path.startswith("/") and path[1:].split("/", 1)[0] in _PROTECTED_ROOTS
+
+async def send_rejection(scope, send, status_code: int):
+    """Reject a connection before it reaches the app"""
+    if scope["type"] == "websocket":
+        await send({"type": "websocket.close", "code": 1008})
+        return
+    headers, body = _REJECTIONS[status_code]
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
 
 # Security Middleware
-@app.middleware("http")
-async def security_middleware(request: Request, call_next):
-    """Apply security checks and headers"""
-    start_time = time.time()
-    client_ip = get_client_ip(request)
-    
-    # Log request
-    logger.info(f"🌐 {request.method} {request.url.path} from {client_ip}")
-    
-    # Rate limiting
-    if is_rate_limited(client_ip):
-        logger.warning(f"🚫 Rate limit exceeded for {client_ip}")
-        return JSONResponse(
-            status_code=429,
-            content={"error": "Rate limit exceeded. Please try again later."},
-            headers=SECURITY_HEADERS
-        )
-    
-    # API key authentication for protected endpoints
-    if requires_api_key(request.url.path):
-        api_key = request.headers.get("X-API-Key")
-        if not verify_api_key(api_key):
-            logger.warning(f"🔐 Unauthorized access attempt to {request.url.path} from {client_ip}")
-            return JSONResponse(
-                status_code=401,
-                content={"error": "Unauthorized. Valid X-API-Key header required."},
-                headers=SECURITY_HEADERS
-            )
-        logger.info(f"✅ Authorized access to {request.url.path} from {client_ip}")
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Add security headers
-    for header, value in SECURITY_HEADERS.items():
-        response.headers[header] = value
-    
-    # Log response
-    process_time = time.time() - start_time
-    logger.info(f"📊 {request.method} {request.url.path} → {response.status_code} ({process_time:.3f}s)")
-    
-    return response
+class SecurityMiddleware:
+    """Apply security checks and headers as a pure ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        client_ip = get_client_ip(scope)
+        method = scope.get("method", "WS")
+        path = scope["path"]
+        log_info = logger.isEnabledFor(logging.INFO)
+        
+        # Log request
+        if log_info:
+            logger.info("🌐 %s %s from %s", method, path, client_ip)
+        
+        # Rate limiting
+        if is_rate_limited(client_ip, start_time):
+            logger.warning("🚫 Rate limit exceeded for %s", client_ip)
+            await send_rejection(scope, send, 429)
+            return
+        
+        # WebSocket authentication is handled by the endpoint itself
+        if scope["type"] == "websocket":
+            await self.app(scope, receive, send)
+            return
+        
+        # API key authentication for protected endpoints
+        if requires_api_key(path):
+            api_key = get_header(scope, b"x-api-key")
+            if not verify_api_key(api_key):
+                logger.warning("🔐 Unauthorized access attempt to %s from %s", path, client_ip)
+                await send_rejection(scope, send, 401)
+                return
+            if log_info:
+                logger.info("✅ Authorized access to %s from %s", path, client_ip)
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                # Add security headers
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + _SECURITY_HEADERS_RAW
+            await send(message)
+        
+        # Process request
+        await self.app(scope, receive, send_wrapper)
+        
+        # Log response
+        if log_info:
+            process_time = time.perf_counter() - start_time
+            logger.info("📊 %s %s → %s (%.3fs)", method, path, status_code, process_time)
+
+app.add_middleware(SecurityMiddleware)
+
+# Background tasks started with the server
+background_tasks = set()
+
+@app.on_event("startup")
+async def start_rate_limit_sweeper():
+    """Start the idle rate limit bucket sweeper"""
+    task = asyncio.create_task(rate_limit_sweeper())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """Cancel background tasks started with the server"""
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+# Shared HTTP client for outbound WHOOP API calls (keeps connections warm)
+http_client: httpx.AsyncClient | None = None
+
+@app.on_event("startup")
+async def open_http_client():
+    """Create the shared outbound HTTP client"""
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """Close the shared outbound HTTP client"""
+    if http_client is not None:
+        await http_client.aclose()
 
 # Add CORS middleware (with more restrictive settings for production)
 app.add_middleware(
@@ -146,54 +305,65 @@ app.add_middleware(
     allow_headers=["X-API-Key", "Content-Type", "Authorization"],
 )
 
+# Constant response bodies, encoded once at startup
+_HEALTH_BODY = encode_json({"status": "healthy", "service": "whoop-mcp"})
+_ROOT_BODY = encode_json({
+    "name": "WHOOP MCP Server",
+    "version": "2.0.0",
+    "description": "WHOOP Model Context Protocol Server with enhanced API v2 features",
+    "security": {
+        "protected_endpoints": list(PROTECTED_ENDPOINTS),
+        "authentication": "X-API-Key header required for protected endpoints",
+        "rate_limit": f"{RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds"
+    },
+    "endpoints": {
+        "health": "/health (public)",
+        "mcp_ws": "/mcp (protected - requires X-API-Key)",
+        "tools": "/tools (protected - requires X-API-Key)",
+        "auth": "/auth (protected - requires X-API-Key)"
+    },
+    "features": [
+        "🔐 Secure API key authentication",
+        "🛡️ Rate limiting protection", 
+        "📊 Request logging & monitoring",
+        "🚀 WHOOP API v2 integration",
+        "📈 Enhanced workout analysis with elevation tracking",
+        "😴 Advanced sleep quality assessment", 
+        "💚 Recovery load analysis",
+        "🎯 Training readiness scoring",
+        "📊 Body composition tracking",
+        "🇺🇸 US units & EST timezone formatting",
+        "📅 Comprehensive daily summaries"
+    ],
+    "usage": {
+        "authentication": "Include 'X-API-Key: your-api-key' header for protected endpoints",
+        "websocket": "Connect to /mcp with X-API-Key header for MCP communication"
+    }
+})
+
+# Encoded /tools response, filled on first successful request
+_TOOLS_CACHE = None
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint for fly.io"""
-    return {"status": "healthy", "service": "whoop-mcp"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 # Root endpoint with API info
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "name": "WHOOP MCP Server",
-        "version": "2.0.0",
-        "description": "WHOOP Model Context Protocol Server with enhanced API v2 features",
-        "security": {
-            "protected_endpoints": list(PROTECTED_ENDPOINTS),
-            "authentication": "X-API-Key header required for protected endpoints",
-            "rate_limit": f"{RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds"
-        },
-        "endpoints": {
-            "health": "/health (public)",
-            "mcp_ws": "/mcp (protected - requires X-API-Key)",
-            "tools": "/tools (protected - requires X-API-Key)",
-            "auth": "/auth (protected - requires X-API-Key)"
-        },
-        "features": [
-            "🔐 Secure API key authentication",
-            "🛡️ Rate limiting protection", 
-            "📊 Request logging & monitoring",
-            "🚀 WHOOP API v2 integration",
-            "📈 Enhanced workout analysis with elevation tracking",
-            "😴 Advanced sleep quality assessment", 
-            "💚 Recovery load analysis",
-            "🎯 Training readiness scoring",
-            "📊 Body composition tracking",
-            "🇺🇸 US units & EST timezone formatting",
-            "📅 Comprehensive daily summaries"
-        ],
-        "usage": {
-            "authentication": "Include 'X-API-Key: your-api-key' header for protected endpoints",
-            "websocket": "Connect to /mcp with X-API-Key header for MCP communication"
-        }
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 # Get available tools
 @app.get("/tools")
 async def get_tools():
     """Get list of available MCP tools"""
+    global _TOOLS_CACHE
+    if _TOOLS_CACHE is not None:
+        return Response(content=_TOOLS_CACHE, media_type="application/json")
+    
     try:
         # FastMCP stores tools in a different way - let's try to access them
         tools = []
@@ -226,19 +396,50 @@ async def get_tools():
                     "description": f"WHOOP MCP tool: {tool_name}"
                 })
         
-        return {"tools": tools}
+        _TOOLS_CACHE = encode_json({"tools": tools})
+        return Response(content=_TOOLS_CACHE, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error getting tools: {e}")
         return {"tools": [], "error": "Could not retrieve tools list"}
 
+# Token file helpers (blocking; run via asyncio.to_thread)
+def read_token_file() -> Dict[str, Any]:
+    """Read and parse the WHOOP token file"""
+    with open(TOKEN_FILE, "r") as f:
+        return json.load(f)
+
+def write_token_file(token_data: Dict[str, Any]):
+    """Write the WHOOP token file"""
+    with open(TOKEN_FILE, "w") as f:
+        json.dump(token_data, f)
+
+# Parsed token file, cached as (st_mtime_ns, data)
+_TOKEN_CACHE = None
+
+def _stat_and_read(cached_mtime: int | None):
+    """Stat the token file and read it only if its mtime differs from cached_mtime"""
+    mtime = os.stat(TOKEN_FILE).st_mtime_ns
+    if mtime == cached_mtime:
+        return mtime, None
+    return mtime, read_token_file()
+
+async def load_token_data() -> Dict[str, Any]:
+    """Load token data, re-reading the file only when its mtime changes"""
+    global _TOKEN_CACHE
+    cached = _TOKEN_CACHE
+    mtime, token_data = await asyncio.to_thread(_stat_and_read, cached[0] if cached else None)
+    if token_data is None:
+        return cached[1]
+    _TOKEN_CACHE = (mtime, token_data)
+    return token_data
+
 # Authentication status endpoint
 @app.get("/auth")
 async def auth_status():
     """Check WHOOP authentication status"""
     try:
-        with open(TOKEN_FILE, "r") as f:
-            token_data = json.load(f)
+        token_data = await load_token_data()
         return {
             "authenticated": True,
             "token_type": token_data.get("token_type", "unknown"),
@@ -294,7 +495,7 @@ async def whoop_auth_start():
 @app.get("/whoop/callback")
 async def whoop_oauth_callback(request: Request):
     """Handle WHOOP OAuth callback"""
-    import httpx
+    global _TOKEN_CACHE
     from urllib.parse import parse_qs
     
     # Get query parameters
@@ -336,39 +537,38 @@ async def whoop_oauth_callback(request: Request):
             "redirect_uri": os.getenv("WHOOP_REDIRECT_URI", "https://whoop-mcp.fly.dev/whoop/callback")
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=token_data)
+        response = await http_client.post(token_url, data=token_data)
+        
+        if response.status_code == 200:
+            token_response = response.json()
+            
+            # Save token to file
+            await asyncio.to_thread(write_token_file, token_response)
+            _TOKEN_CACHE = None
+            
+            logger.info("WHOOP authentication successful")
+            
+            # Return success page
+            return JSONResponse(
+                content={
+                    "success": True,
+                    "message": "WHOOP authentication successful!",
+                    "token_type": token_response.get("token_type"),
+                    "expires_in": token_response.get("expires_in"),
+                    "instructions": "You can now close this tab and use WHOOP tools in your MCP client."
+                }
+            )
+        else:
+            logger.error(f"Token exchange failed: {response.status_code} - {response.text}")
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "Token exchange failed",
+                    "status_code": response.status_code,
+                    "message": "Failed to exchange authorization code for access token"
+                }
+            )
             
-            if response.status_code == 200:
-                token_response = response.json()
-                
-                # Save token to file
-                with open(TOKEN_FILE, "w") as f:
-                    json.dump(token_response, f)
-                
-                logger.info("WHOOP authentication successful")
-                
-                # Return success page
-                return JSONResponse(
-                    content={
-                        "success": True,
-                        "message": "WHOOP authentication successful!",
-                        "token_type": token_response.get("token_type"),
-                        "expires_in": token_response.get("expires_in"),
-                        "instructions": "You can now close this tab and use WHOOP tools in your MCP client."
-                    }
-                )
-            else:
-                logger.error(f"Token exchange failed: {response.status_code} - {response.text}")
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "error": "Token exchange failed",
-                        "status_code": response.status_code,
-                        "message": "Failed to exchange authorization code for access token"
-                    }
-                )
-                
     except Exception as e:
         logger.error(f"OAuth callback error: {e}")
         return JSONResponse(
@@ -379,192 +579,169 @@ async def whoop_oauth_callback(request: Request):
             }
         )
 
+# Pre-encoded JSON-RPC envelopes; only the id (and error details) vary per message
+_INITIALIZE_RESPONSE = (
+    b'{"jsonrpc":"2.0","id":%s,"result":{"protocolVersion":"2024-11-05",'
+    b'"capabilities":{"tools":{},"prompts":{},"resources":{}},'
+    b'"serverInfo":{"name":"whoop-mcp","version":"2.0.0"}}}'
+)
+_RESULT_RESPONSE = b'{"jsonrpc":"2.0","id":%s,"result":%s}'
+_ERROR_RESPONSE = b'{"jsonrpc":"2.0","id":%s,"error":{"code":%d,"message":%s}}'
+
+def encode_rpc_error(message_id: Any, code: int, message: str) -> bytes:
+    """Encode a JSON-RPC error response"""
+    return _ERROR_RESPONSE % (orjson.dumps(message_id), code, orjson.dumps(message))
+
+_INVALID_JSON_RESPONSE = encode_rpc_error(None, -32700, "Invalid JSON format")
+
+@functools.cache
+def tools_list_result_json() -> bytes:
+    """JSON-encoded tools/list result; tools are registered at import, so build it once"""
+    tools = []
+    for tool_name, tool_func in whoop_mcp._tools.items():
+        tool_schema = {
+            "name": tool_name,
+            "description": tool_func.__doc__ or "No description available",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        }
+        tools.append(tool_schema)
+    return orjson.dumps({"tools": tools})
+
+async def handle_initialize(message: Dict[str, Any]) -> bytes:
+    """MCP initialization"""
+    return _INITIALIZE_RESPONSE % orjson.dumps(message.get("id"))
+
+async def handle_tools_list(message: Dict[str, Any]) -> bytes:
+    """List available tools"""
+    return _RESULT_RESPONSE % (orjson.dumps(message.get("id")), tools_list_result_json())
+
+async def handle_tools_call(message: Dict[str, Any]) -> bytes:
+    """Call a tool"""
+    params = message.get("params", {})
+    tool_name = params.get("name")
+    arguments = params.get("arguments", {})
+    
+    if tool_name not in whoop_mcp._tools:
+        return encode_rpc_error(message.get("id"), -32601, f"Tool not found: {tool_name}")
+    
+    try:
+        # Call the tool function
+        tool_func = whoop_mcp._tools[tool_name]
+        if asyncio.iscoroutinefunction(tool_func):
+            result = await tool_func(**arguments)
+        else:
+            result = tool_func(**arguments)
+    except Exception as e:
+        # Log detailed error for debugging but don't expose to client
+        logger.error("Tool execution error for %s: %s", tool_name, e)
+        return encode_rpc_error(
+            message.get("id"),
+            -32603,
+            "Tool execution failed. Please check your authentication and try again."
+        )
+    
+    return orjson.dumps({
+        "jsonrpc": "2.0",
+        "id": message.get("id"),
+        "result": {
+            "content": [
+                {
+                    "type": "text",
+                    "text": str(result)
+                }
+            ]
+        }
+    })
+
+# JSON-RPC method handlers for the MCP WebSocket
+MCP_HANDLERS = {
+    "initialize": handle_initialize,
+    "tools/list": handle_tools_list,
+    "tools/call": handle_tools_call,
+}
+
+async def send_json(websocket: WebSocket, body: bytes):
+    """Send an encoded JSON-RPC message as a text frame"""
+    await websocket.send_text(body.decode())
+
 # WebSocket endpoint for MCP communication
 @app.websocket("/mcp")
 async def mcp_websocket(websocket: WebSocket):
     """WebSocket endpoint for MCP communication"""
     
     # Check API key for WebSocket connection
-    api_key = None
-    for name, value in websocket.headers.items():
-        if name.lower() == "x-api-key":
-            api_key = value
-            break
+    api_key = get_header(websocket.scope, b"x-api-key")
     
     if not verify_api_key(api_key):
         client_ip = websocket.client.host if websocket.client else "unknown"
-        logger.warning(f"🔐 Unauthorized WebSocket connection attempt from {client_ip}")
+        logger.warning("🔐 Unauthorized WebSocket connection attempt from %s", client_ip)
         await websocket.close(code=1008, reason="Unauthorized: Valid X-API-Key header required")
         return
     
     await websocket.accept()
     client_ip = websocket.client.host if websocket.client else "unknown"
-    logger.info(f"✅ Authorized MCP WebSocket connection established from {client_ip}")
+    logger.info("✅ Authorized MCP WebSocket connection established from %s", client_ip)
     
     try:
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            logger.info(f"Received MCP message: {data[:100]}...")
+            # Receive raw frame from client (text or binary)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            data = frame["text"] if frame.get("text") is not None else frame.get("bytes") or b""
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Received MCP message: %s...", data[:100])
             
             try:
-                # Parse JSON-RPC message with validation
-                if len(data) > 10000:  # Limit message size
+                # Limit message size before parsing
+                if len(data) > MCP_MAX_MESSAGE_SIZE:
                     raise ValueError("Message too large")
                 
-                message = json.loads(data)
+                # Parse JSON-RPC message with validation
+                message = orjson.loads(data)
                 
                 # Validate message structure
                 if not isinstance(message, dict):
                     raise ValueError("Invalid message format")
                 
-                # Sanitize input
-                method = str(message.get("method", "")).strip()[:100]  # Limit method name length
+                raw_method = message.get("method")
                 message_id = message.get("id")
                 
-                # Handle different message types
-                if message.get("method") == "initialize":
-                    # MCP initialization
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": message.get("id"),
-                        "result": {
-                            "protocolVersion": "2024-11-05",
-                            "capabilities": {
-                                "tools": {},
-                                "prompts": {},
-                                "resources": {}
-                            },
-                            "serverInfo": {
-                                "name": "whoop-mcp",
-                                "version": "2.0.0"
-                            }
-                        }
-                    }
-                    await websocket.send_text(json.dumps(response))
-                
-                elif message.get("method") == "tools/list":
-                    # List available tools
-                    tools = []
-                    for tool_name, tool_func in whoop_mcp._tools.items():
-                        tool_schema = {
-                            "name": tool_name,
-                            "description": tool_func.__doc__ or "No description available",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {},
-                                "required": []
-                            }
-                        }
-                        tools.append(tool_schema)
-                    
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": message.get("id"),
-                        "result": {"tools": tools}
-                    }
-                    await websocket.send_text(json.dumps(response))
-                
-                elif message.get("method") == "tools/call":
-                    # Call a tool
-                    params = message.get("params", {})
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    
-                    if tool_name in whoop_mcp._tools:
-                        try:
-                            # Call the tool function
-                            tool_func = whoop_mcp._tools[tool_name]
-                            if asyncio.iscoroutinefunction(tool_func):
-                                result = await tool_func(**arguments)
-                            else:
-                                result = tool_func(**arguments)
-                            
-                            response = {
-                                "jsonrpc": "2.0",
-                                "id": message.get("id"),
-                                "result": {
-                                    "content": [
-                                        {
-                                            "type": "text",
-                                            "text": str(result)
-                                        }
-                                    ]
-                                }
-                            }
-                        except Exception as e:
-                            # Log detailed error for debugging but don't expose to client
-                            logger.error(f"Tool execution error for {tool_name}: {e}")
-                            response = {
-                                "jsonrpc": "2.0",
-                                "id": message.get("id"),
-                                "error": {
-                                    "code": -32603,
-                                    "message": "Tool execution failed. Please check your authentication and try again."
-                                }
-                            }
-                    else:
-                        response = {
-                            "jsonrpc": "2.0",
-                            "id": message.get("id"),
-                            "error": {
-                                "code": -32601,
-                                "message": f"Tool not found: {tool_name}"
-                            }
-                        }
-                    
-                    await websocket.send_text(json.dumps(response))
-                
+                # Dispatch to the method handler (exact match on the raw method name)
+                handler = MCP_HANDLERS.get(raw_method) if isinstance(raw_method, str) else None
+                if handler:
+                    response = await handler(message)
                 else:
-                    # Unknown method
-                    response = {
-                        "jsonrpc": "2.0",
-                        "id": message.get("id"),
-                        "error": {
-                            "code": -32601,
-                            "message": f"Method not found: {message.get('method')}"
-                        }
-                    }
-                    await websocket.send_text(json.dumps(response))
+                    # Unknown method; log a sanitized, length-limited name
+                    method = str(raw_method or "").strip()[:100]
+                    logger.warning("Unknown MCP method from %s: %s", client_ip, method)
+                    response = encode_rpc_error(message_id, -32601, f"Method not found: {raw_method}")
+                await send_json(websocket, response)
                     
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error from {client_ip}: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32700,
-                        "message": "Invalid JSON format"
-                    }
-                }
-                await websocket.send_text(json.dumps(error_response))
+            except orjson.JSONDecodeError as e:
+                logger.error("JSON decode error from %s: %s", client_ip, e)
+                await send_json(websocket, _INVALID_JSON_RESPONSE)
             
             except ValueError as e:
-                logger.error(f"Validation error from {client_ip}: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": message_id if 'message_id' in locals() else None,
-                    "error": {
-                        "code": -32602,
-                        "message": "Invalid request format"
-                    }
-                }
-                await websocket.send_text(json.dumps(error_response))
+                logger.error("Validation error from %s: %s", client_ip, e)
+                error_response = encode_rpc_error(
+                    message_id if 'message_id' in locals() else None, -32602, "Invalid request format"
+                )
+                await send_json(websocket, error_response)
             
             except Exception as e:
-                logger.error(f"Unexpected error from {client_ip}: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": message_id if 'message_id' in locals() else None,
-                    "error": {
-                        "code": -32603,
-                        "message": "Internal server error"
-                    }
-                }
-                await websocket.send_text(json.dumps(error_response))
+                logger.error("Unexpected error from %s: %s", client_ip, e)
+                error_response = encode_rpc_error(
+                    message_id if 'message_id' in locals() else None, -32603, "Internal server error"
+                )
+                await send_json(websocket, error_response)
     
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
     finally:
         logger.info("MCP WebSocket connection closed")
 
@@ -578,6 +755,7 @@ if __name__ == "__main__":
         app,
         host=host,
         port=port,
-        log_level="info",
-        access_log=True
+        log_level="warning",
+        access_log=False,  # SecurityMiddleware already logs every request
+        ws_max_size=WS_MAX_FRAME_SIZE
     )
\ No newline at end of file